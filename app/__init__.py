@@ -5,20 +5,95 @@ from flask_sqlalchemy import SQLAlchemy # package for managing the database inte
 from flask_migrate import Migrate # package for handling database migrations
 from flask_login import LoginManager # package that manages uers authentication and sessions
 import logging
-from logging.handlers import SMTPHandler, RotatingFileHandler
+from logging.handlers import SMTPHandler, RotatingFileHandler, QueueHandler, QueueListener, MemoryHandler
+import queue
+import threading
+import time
+import atexit
 import os
 
-appy = Flask(__name__) # Initializing the app as a Flask object
-appy.config.from_object(Config)
+db = SQLAlchemy() # Creating the database object, bound to the app in create_app()
+migrate = Migrate()
 
-db = SQLAlchemy(appy) # Initializing the database
-migrate = Migrate(appy, db)
+login = LoginManager() # Creating a login manager object
+login.login_view = 'main.login' # setting the view for the login object
 
-login = LoginManager(appy) # Creating a login manager object
-login.login_view = 'login' # setting the view for the login object
+# background logging workers are started on the first request rather than at import, so a process that
+# forks its workers after importing the app (e.g. gunicorn --preload) starts them in each worker
+_log_workers = [] # callables that start a background logging worker
+_log_workers_started = False
+_log_workers_lock = threading.Lock()
+
+def _start_log_workers():
+    """
+    starts the background logging workers once per process, registered to run before every request
+    """
+    global _log_workers_started
+    if _log_workers_started:
+        return
+    with _log_workers_lock:
+        if not _log_workers_started:
+            for start in _log_workers:
+                start()
+            _log_workers_started = True
+
+def _stop_mail_listener(listener):
+    """
+    sends any queued emails before the process exits
+
+    Threads cannot be started during interpreter shutdown, so if no request was served and the listener never started, the queue is drained in this thread instead.
+
+    Args:
+        listener (QueueListener): listener to be stopped
+    """
+    if _log_workers_started:
+        listener.stop()
+        return
+    while not listener.queue.empty():
+        listener.handle(listener.queue.get_nowait())
+
+def _flush_periodically(handler, interval):
+    """
+    flushes a buffering log handler every interval seconds, meant to be run in a daemon thread
+
+    Args:
+        handler (MemoryHandler): handler to be flushed
+        interval (int): number of seconds between flushes
+    """
+    while True:
+        time.sleep(interval)
+        handler.flush()
+
+def _close_file_log(buffered_handler, file_handler):
+    """
+    writes out any buffered records and closes the log file before the process exits
+
+    The MemoryHandler drops its reference to the file handler when it is closed, so the file handler is closed here explicitly.
+
+    Args:
+        buffered_handler (MemoryHandler): handler buffering the records
+        file_handler (RotatingFileHandler): handler writing to the log file
+    """
+    buffered_handler.flush()
+    file_handler.close()
+
+def _configure_logging(appy):
+    """
+    attaches the email and file log handlers to the app logger, doing nothing if they are already attached
+
+    Args:
+        appy (Flask): app whose logger is configured
+    """
+    # if statement to check if the app is running without debug mode, only running code below if so
+    if appy.debug:
+        return
+    # if statement checking if the handlers were already attached, so every record is only written once
+    # the flag is kept on the logger since every app created from this package shares the same logger
+    if getattr(appy.logger, '_logging_initialized', False):
+        return
+    appy.logger._logging_initialized = True
+    appy.logger.propagate = False # records are handled here, not passed on to the root logger as well
 
-# if statement to check if the app is running without debug mode, only running code below if so
-if not appy.debug:
     if appy.config['MAIL_SERVER']: # if statement checkinf if email server exists in configuration
         auth = None
         if appy.config['MAIL_USERNAME'] or appy.config['MAIL_PASSWORD']:
@@ -32,20 +107,59 @@ if not appy.debug:
             toaddrs=appy.config['ADMINS'], subject='Microblog Failure',
             credentials=auth, secure=secure)
         mail_handler.setLevel(logging.ERROR)
-        appy.logger.addHandler(mail_handler)
-        
-    # if statement checking if logs directory exists
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
+        # the request thread only puts records on a queue, a background listener thread sends the emails
+        mail_queue = queue.Queue(-1)
+        queue_handler = QueueHandler(mail_queue)
+        queue_handler.setLevel(logging.ERROR)
+        appy.logger.addHandler(queue_handler)
+        mail_listener = QueueListener(mail_queue, mail_handler, respect_handler_level=True)
+        _log_workers.append(mail_listener.start)
+        atexit.register(_stop_mail_listener, mail_listener)
+    
+    os.makedirs('logs', exist_ok=True) # creating the logs directory if it does not exist yet
     file_handler = RotatingFileHandler('logs/microblog.log', 
-                                       maxBytes=10240, #max log size is 10kb
+                                       maxBytes=1048576, #max log size is 1mb
                                        backupCount=10)
     file_handler.setFormatter(logging.Formatter(
         '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
     file_handler.setLevel(logging.INFO)
-    appy.logger.addHandler(file_handler)
+    # buffering records in memory so the log file is written in batches, errors are written out immediately
+    buffered_handler = MemoryHandler(capacity=1000, flushLevel=logging.ERROR, target=file_handler)
+    buffered_handler.setLevel(logging.INFO)
+    appy.logger.addHandler(buffered_handler)
+    _log_workers.append(threading.Thread(target=_flush_periodically, args=(buffered_handler, 30), daemon=True).start)
+    atexit.register(_close_file_log, buffered_handler, file_handler)
 
     appy.logger.setLevel(logging.INFO)
     appy.logger.info('Microblog startup')
 
-from app import routes, models, errors # import statement to prevent circular imports
\ No newline at end of file
+def create_app(config_class=Config):
+    """
+    builds the Flask app, binding the extensions and registering the views and error handlers on it
+
+    Every app built from this package shares the 'app' logger, so the log handlers are only attached by the first non-debug app.
+
+    Args:
+        config_class (class): configuration object to load the app settings from
+
+    Returns:
+        Flask: the configured app
+    """
+    appy = Flask(__name__) # Initializing the app as a Flask object
+    appy.config.from_object(config_class)
+
+    db.init_app(appy) # Initializing the database
+    migrate.init_app(appy, db)
+    login.init_app(appy)
+
+    # imported here to prevent circular imports, the blueprints import db and login from this module
+    from app.routes import bp as main_bp
+    appy.register_blueprint(main_bp)
+    from app.errors import bp as errors_bp
+    appy.register_blueprint(errors_bp)
+
+    _configure_logging(appy)
+    appy.before_request(_start_log_workers)
+    return appy
+
+appy = create_app() # app used by microblog.py, asgi.py and the tests
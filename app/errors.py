@@ -1,11 +1,37 @@
-from flask import render_template
-from app import appy, db
+from functools import lru_cache
+from flask import Blueprint, current_app, render_template, session
+from flask_login import current_user
+from app import db
 
-@appy.errorhandler(404) # decorator for custom error handling
+bp = Blueprint('errors', __name__) # blueprint holding the error handlers, registered on the app in create_app()
+
+@lru_cache(maxsize=None)
+def _render_anonymous_error(appy, template):
+    """renders an error page once per app for anonymous visitors with no flashed messages, later calls reuse the result"""
+    return render_template(template)
+
+def _render_error(template):
+    """
+    renders an error page, reusing the rendered page for anonymous visitors
+
+    The error pages only vary with the logged in user and flashed messages, so the page is cached when neither is present. Debug mode always renders so template edits show up.
+
+    Args:
+        template (str): name of the error template
+
+    Returns:
+        str: the rendered page
+    """
+    if current_app.debug or current_user.is_authenticated or '_flashes' in session:
+        return render_template(template)
+    return _render_anonymous_error(current_app._get_current_object(), template)
+
+@bp.app_errorhandler(404) # decorator for custom error handling
 def not_found_error(error):
-    return render_template('404.html'), 404
+    return _render_error('404.html'), 404
 
-@appy.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
-    db.session.rollback()
-    return render_template('500.html'), 500
\ No newline at end of file
+    if db.session().in_transaction(): # only rolling back if the request actually started a database transaction
+        db.session.rollback()
+    return _render_error('500.html'), 500
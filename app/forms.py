@@ -6,6 +6,13 @@ import sqlalchemy as sa
 from app import db
 from app.models import User
 
+# statements built once so every validation reuses the same compiled SQL
+USERNAME_EXISTS = sa.exists().where(User.username == sa.bindparam('username'))
+EMAIL_EXISTS = sa.exists().where(User.email == sa.bindparam('email'))
+USERNAME_TAKEN = sa.select(USERNAME_EXISTS)
+USERNAME_OR_EMAIL_TAKEN = sa.select(USERNAME_EXISTS.label('username'),
+                                    EMAIL_EXISTS.label('email'))
+
 class LoginForm(FlaskForm):
     """
     LoginForm class that stores the necessary fields for the login page. 
@@ -130,35 +137,31 @@ class RegistrationForm(FlaskForm):
     
     submit = SubmitField('Register') # creates a register button
 
-    def validate_username(self, username):
+    def validate(self, extra_validators=None):
         """
-        This method checks if the username is already use in the database
+        This method runs the field validators, then checks in a single query if the username or email is already registered with an existing user in the database
 
         Attributes:
-            username: username to be validated
-        """
-        # retrieving any existing users in the database based on the username
-        user = db.session.scalar(sa.select(User).where(
-            User.username == username.data))
-        
-        # if statement checking if any users have been found and raising a ValidationError if so
-        if user is not None:
-            raise ValidationError('Please use a different username.')
+            extra_validators: additional validators passed on to each field
 
-    def validate_email(self, email):
+        Returns:
+            boolean value indicating if the form is valid
         """
-        This method checks if the email is already registered with an existing user in the database
-
-        Attributes:
-            email: email to be validated
-        """
-        # retrieving any existing users based on the email
-        user = db.session.scalar(sa.select(User).where(
-            User.email == email.data))
+        valid = super().validate(extra_validators)
+        if self.username.errors and self.email.errors: # both fields already failed, no need to query the database
+            return valid
+        
+        taken = db.session.execute(USERNAME_OR_EMAIL_TAKEN, {
+            'username': self.username.data, 'email': self.email.data}).one()
         
-        # if statement checking if any users have been found and raising a ValidationError if so
-        if user is not None:
-            raise ValidationError('Please use a different email address.')
+        # if statements adding an error to each field that is already in use
+        if taken.username and not self.username.errors:
+            self.username.errors.append('Please use a different username.')
+            valid = False
+        if taken.email and not self.email.errors:
+            self.email.errors.append('Please use a different email address.')
+            valid = False
+        return valid
 
 class EditProfileForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -171,9 +174,7 @@ class EditProfileForm(FlaskForm):
 
     def validate_username(self, username):
         if username.data != self.original_username:
-            user = db.session.scalar(sa.select(User).where(
-                User.username == username.data))
-            if user is not None:
+            if db.session.execute(USERNAME_TAKEN, {'username': username.data}).scalar_one():
                 raise ValidationError('Please use a different username.')
             
 class PostForm(FlaskForm):
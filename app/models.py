@@ -7,6 +7,10 @@ from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
+# scrypt with explicit n:r:p parameters (Werkzeug 3's default), so the login cost does not change silently with Werkzeug upgrades
+# raise the parameters to harden hashing, existing hashes keep verifying since check_password_hash reads the method stored in the hash
+PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
 @login.user_loader # decorator that tells Flask-Login how to load user from the database based on the user id
 def load_user(id):
     """
@@ -20,7 +24,13 @@ def load_user(id):
     Returns:
         User: user retrieved from database
     """
-    return db.session.get(entity= User, ident = int(id))
+    uid = int(id)
+    # checking the session's identity map before falling back to the prebuilt select
+    # deleted or expired instances go through the query like session.get would, which returns None if the row is gone
+    user = db.session.identity_map.get(so.Session.identity_key(User, uid))
+    if user is None or sa.inspect(user).deleted or sa.inspect(user).expired:
+        user = db.session.scalars(USER_BY_ID, {'id': uid}).first()
+    return user
 
 followers = sa.Table(
     'followers',
@@ -54,6 +64,7 @@ class User(db.Model, UserMixin):
     email: so.Mapped[str] = so.mapped_column(sa.String(120), index=True,
                                              unique=True)
     password_hash: so.Mapped[Optional[str]] = so.mapped_column(sa.String(256))
+    avatar_hash: so.Mapped[Optional[str]] = so.mapped_column(sa.String(32)) # cached Gravatar digest of the email
 
     posts: so.WriteOnlyMapped['Post'] = so.relationship(
         back_populates='author')
@@ -89,8 +100,8 @@ class User(db.Model, UserMixin):
         """
         used to set password of the user with a hash
         """
-        # generating a hash for the password and setting it as an attribute for the class
-        self.password_hash = generate_password_hash(password)
+        # generating a hash for the password with a pinned algorithm and cost, and setting it as an attribute for the class
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
     def check_password(self, password):
         """
@@ -104,9 +115,26 @@ class User(db.Model, UserMixin):
         """
         return check_password_hash(self.password_hash, password)
     
+    @so.validates('email')
+    def validate_email(self, key, email):
+        """
+        keeps the cached Gravatar digest in sync whenever the email is set
+
+        Args:
+            - key (str): name of the attribute being set
+            - email (str): new email of the user
+
+        Returns:
+            - the email, unchanged
+        """
+        self.avatar_hash = md5(email.lower().encode('utf-8')).hexdigest()
+        return email
+
     # generating the avatar using Gravatar service
     def avatar(self, size):
-        digest = md5(self.email.lower().encode('utf-8')).hexdigest()
+        digest = self.avatar_hash
+        if digest is None: # rows created before avatar_hash existed
+            digest = md5(self.email.lower().encode('utf-8')).hexdigest()
         return f'https://www.gravatar.com/avatar/{digest}?d=identicon&s={size}'
     
     def follow(self, user):
@@ -118,45 +146,80 @@ class User(db.Model, UserMixin):
             self.following.remove(user)
 
     def is_following(self, user):
-        query = self.following.select().where(User.id == user.id)
+        # probing the followers association table directly hits its composite primary key without loading a User row
+        query = (
+            sa.select(followers.c.follower_id)
+            .where(followers.c.follower_id == self.id,
+                   followers.c.followed_id == user.id)
+            .limit(1)
+        )
         return db.session.scalar(query) is not None
 
     def followers_count(self):
-        query = sa.select(sa.func.count()).select_from(
-            self.followers.select().subquery())
-        return db.session.scalar(query)
+        # counting straight off the association table avoids joining back to user
+        query = sa.select(sa.func.count()).select_from(followers).where(
+            followers.c.followed_id == self.id)
+        return db.session.execute(query).scalar_one()
 
     def following_count(self):
-        query = sa.select(sa.func.count()).select_from(
-            self.following.select().subquery())
-        return db.session.scalar(query)
+        query = sa.select(sa.func.count()).select_from(followers).where(
+            followers.c.follower_id == self.id)
+        return db.session.execute(query).scalar_one()
     
+    def following_list(self):
+        """
+        retrieves every user this user follows in a single query
+
+        Returns:
+            - list of User objects followed by this user
+        """
+        query = sa.select(User).join(followers, followers.c.followed_id == User.id).where(
+            followers.c.follower_id == self.id)
+        return db.session.scalars(query).all()
+
+    def followers_list(self):
+        """
+        retrieves every user following this user in a single query
+
+        Returns:
+            - list of User objects following this user
+        """
+        query = sa.select(User).join(followers, followers.c.follower_id == User.id).where(
+            followers.c.followed_id == self.id)
+        return db.session.scalars(query).all()
+
     def following_posts(self):
-        Author = so.aliased(User)
-        Follower = so.aliased(User)
+        # ids of every user this user follows, used as a semi-join so no post is ever duplicated
+        followed_ids = sa.select(followers.c.followed_id).where(
+            followers.c.follower_id == self.id)
         return (
             sa.select(Post)
-            .join(Post.author.of_type(Author)) # joining user_id under post db to author
-            .join(Author.followers.of_type(Follower), isouter=True) # joining user_id of author to user_id of follower
+            .options(so.joinedload(Post.author, innerjoin=True)) # loading each post's author in the same query so templates do not lazy-load it
             .where(sa.or_(
-                Follower.id == self.id, # filter out all posts that are not posted by users followed by this target user
-                Author.id == self.id, # filter out all posts not posted by the user
-            )) 
-            .group_by(Post) # prevents duplicated posts by the same user
+                Post.user_id == self.id, # keep posts written by the user
+                Post.user_id.in_(followed_ids), # keep posts written by users this user follows
+            ))
             .order_by(Post.timestamp.desc())
         )
 
 
+USER_BY_ID = sa.select(User).where(User.id == sa.bindparam('id')) # statement built once for load_user
+
+
 class Post(db.Model):
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
     body: so.Mapped[str] = so.mapped_column(sa.String(140))
     timestamp: so.Mapped[datetime] = so.mapped_column(
         index=True, default=lambda: datetime.now(timezone.utc))
-    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(User.id),
-                                               index=True)
+    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey(User.id)) # indexed through ix_post_user_timestamp below
 
     author: so.Mapped[User] = so.relationship(back_populates='posts')
     # so.relationship() to map Post User ID to author ID
 
+    __table_args__ = (
+        # composite index letting the timeline read each author's posts already sorted newest first
+        sa.Index('ix_post_user_timestamp', 'user_id', sa.desc('timestamp')),
+    )
+
     def __repr__(self):
         return '<Post {}>'.format(self.body)
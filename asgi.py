@@ -0,0 +1,4 @@
+from asgiref.wsgi import WsgiToAsgi # adapter exposing the WSGI app to ASGI servers such as uvicorn
+from app import appy
+
+asgi_app = WsgiToAsgi(appy)
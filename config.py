@@ -5,6 +5,19 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True, # replaces connections the database has dropped
+        'pool_recycle': 1800, # reconnects before server-side idle timeouts
+        'query_cache_size': 1200, # compiled SQL statements kept by the engine, up from the default of 500
+    }
+    # in-memory SQLite uses a StaticPool/SingletonThreadPool, which does not accept sizing options
+    if SQLALCHEMY_DATABASE_URI != 'sqlite://' and ':memory:' not in SQLALCHEMY_DATABASE_URI \
+            and 'mode=memory' not in SQLALCHEMY_DATABASE_URI:
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': 10, # connections kept open between requests
+            'max_overflow': 20, # extra connections allowed during bursts
+            'pool_timeout': 30, # seconds to wait for a free connection
+        })
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 25)
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS') is not None
@@ -3,8 +3,13 @@ os.environ['DATABASE_URL'] = 'sqlite://'
 
 from datetime import datetime, timezone, timedelta
 import unittest
-from app import appy, db
+from hashlib import md5
+import sqlalchemy as sa
+from app import appy, db, create_app
+from config import Config
 from app.models import User, Post
+from app.forms import RegistrationForm
+from app.errors import _render_anonymous_error
 
 
 class UserModelCase(unittest.TestCase):
@@ -29,6 +34,8 @@ class UserModelCase(unittest.TestCase):
         self.assertEqual(u.avatar(128), ('https://www.gravatar.com/avatar/'
                                          'd4c74594d841139328695756648b6bd6'
                                          '?d=identicon&s=128'))
+        u.email = 'susan@example.com'
+        self.assertEqual(u.avatar_hash, md5(b'susan@example.com').hexdigest())
 
     def test_follow(self):
         u1 = User(username='john', email='john@example.com')
@@ -50,6 +57,9 @@ class UserModelCase(unittest.TestCase):
         u2_followers = db.session.scalars(u2.followers.select()).all()
         self.assertEqual(u1_following[0].username, 'susan')
         self.assertEqual(u2_followers[0].username, 'john')
+        self.assertEqual(u1.following_list(), [u2])
+        self.assertEqual(u2.followers_list(), [u1])
+        self.assertEqual(u1.followers_list(), [])
 
         u1.unfollow(u2)
         db.session.commit()
@@ -95,6 +105,148 @@ class UserModelCase(unittest.TestCase):
         self.assertEqual(f3, [p3, p4])
         self.assertEqual(f4, [p4])
 
+    def test_follow_posts_loads_author(self):
+        u1 = User(username='john', email='john@example.com')
+        u2 = User(username='susan', email='susan@example.com')
+        db.session.add_all([u1, u2])
+        db.session.add(Post(body="post from susan", author=u2))
+        u1.follow(u2)
+        db.session.commit()
+        db.session.expunge_all()
+
+        u1 = db.session.scalar(sa.select(User).where(User.username == 'john'))
+        posts = db.session.scalars(u1.following_posts()).all()
+        self.assertEqual(len(posts), 1)
+        self.assertNotIn('author', sa.inspect(posts[0]).unloaded)
+        self.assertEqual(posts[0].author.username, 'susan')
+
+
+class RegistrationFormCase(unittest.TestCase):
+    def setUp(self):
+        appy.config['WTF_CSRF_ENABLED'] = False
+        self.app_context = appy.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(User(username='john', email='john@example.com'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        appy.config['WTF_CSRF_ENABLED'] = True
+
+    def validate(self, username, email):
+        data = {'username': username, 'email': email,
+                'password': 'cat', 'password2': 'cat'}
+        with appy.test_request_context(method='POST', data=data):
+            form = RegistrationForm()
+            return form.validate(), form.errors
+
+    def test_neither_taken(self):
+        self.assertEqual(self.validate('susan', 'susan@example.com'), (True, {}))
+
+    def test_username_taken(self):
+        valid, errors = self.validate('john', 'susan@example.com')
+        self.assertFalse(valid)
+        self.assertEqual(errors, {
+            'username': ['Please use a different username.']})
+
+    def test_email_taken(self):
+        valid, errors = self.validate('susan', 'john@example.com')
+        self.assertFalse(valid)
+        self.assertEqual(errors, {
+            'email': ['Please use a different email address.']})
+
+    def test_both_taken(self):
+        valid, errors = self.validate('john', 'john@example.com')
+        self.assertFalse(valid)
+        self.assertEqual(errors, {
+            'username': ['Please use a different username.'],
+            'email': ['Please use a different email address.']})
+
+    def test_invalid_field_not_reported_as_taken(self):
+        # stored values that fail the field validators, so they would also be reported as taken
+        db.session.add(User(username='   ', email='not-an-email'))
+        db.session.commit()
+        valid, errors = self.validate('   ', 'not-an-email')
+        self.assertFalse(valid)
+        self.assertEqual(errors, {
+            'username': ['This field is required.'],
+            'email': ['Invalid email address.']})
+
+        valid, errors = self.validate('susan', 'not-an-email')
+        self.assertFalse(valid)
+        self.assertEqual(errors, {'email': ['Invalid email address.']})
+
+        valid, errors = self.validate('john', 'not-an-email')
+        self.assertFalse(valid)
+        self.assertEqual(errors, {
+            'username': ['Please use a different username.'],
+            'email': ['Invalid email address.']})
+
+
+class ErrorPagesCase(unittest.TestCase):
+    def setUp(self):
+        appy.config['WTF_CSRF_ENABLED'] = False
+        self.app_context = appy.app_context()
+        self.app_context.push()
+        db.create_all()
+        u = User(username='john', email='john@example.com')
+        u.set_password('cat')
+        db.session.add(u)
+        db.session.commit()
+        _render_anonymous_error.cache_clear()
+        self.client = appy.test_client()
+
+    def tearDown(self):
+        _render_anonymous_error.cache_clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        appy.config['WTF_CSRF_ENABLED'] = True
+
+    def test_logged_in_404_not_cached(self):
+        response = self.client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b'Login', response.data)
+        self.assertNotIn(b'Logout', response.data)
+
+        self.client.post('/login', data={'username': 'john', 'password': 'cat'})
+        response = self.client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b'Profile', response.data)
+        self.assertIn(b'Logout', response.data)
+
+    def test_404_with_flash_not_cached(self):
+        with self.client.session_transaction() as session:
+            session['_flashes'] = [('message', 'Pending message')]
+        response = self.client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b'Pending message', response.data)
+        self.assertEqual(_render_anonymous_error.cache_info().currsize, 0)
+
+        response = self.client.get('/missing')
+        self.assertNotIn(b'Pending message', response.data)
+        self.assertEqual(_render_anonymous_error.cache_info().currsize, 1)
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class AppFactoryCase(unittest.TestCase):
+    def test_create_app(self):
+        app = create_app(TestConfig)
+        self.assertIsNot(app, appy)
+        self.assertTrue(app.config['TESTING'])
+        client = app.test_client()
+        self.assertEqual(client.get('/login').status_code, 200)
+        response = client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b'File Not Found', response.data)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file